@@ -1,22 +1,44 @@
+import os
 import re
+import bisect
 import logging
 import config
-from dataclasses import dataclass, field
+from array import array
+
+# Merged results keyed by (path, mtime) so repeated runs over an unchanged
+# SRT file skip the parse-and-merge work. Bounded, evicting oldest first.
+_SRT_MERGE_CACHE: dict[tuple[str, float], list[dict]] = {}
+_SRT_MERGE_CACHE_MAX = 16
 
-@dataclass
 class _SegmentBuffer:
-    """A buffer to hold segment data during the merging process."""
-    text: str = ""
-    start_char_offset: int = -1
-    
-    char_map_slice: list[float] = field(default_factory=list)
+    """A buffer to hold segment data during the merging process.
+
+    Text is accumulated as a list of parts and only joined on demand, so
+    repeated appends stay O(1) instead of rebuilding the string each time.
+    """
+
+    def __init__(self, text: str = "", start_char_offset: int = -1,
+                 char_map_slice: array | None = None):
+        self._text_parts = [text] if text else []
+        self._char_len = len(text)
+        self._joined_text: str | None = text
+        self.start_char_offset = start_char_offset
+        self.char_map_slice = char_map_slice if char_map_slice is not None else array('d')
+        self.end_char_offset = self.start_char_offset + self._char_len - 1
+
+    @property
+    def text(self) -> str:
+        if self._joined_text is None:
+            self._joined_text = "".join(self._text_parts)
+        return self._joined_text
 
-    def __post_init__(self):
-        self.end_char_offset = self.start_char_offset + len(self.text) -1
+    @property
+    def char_len(self) -> int:
+        return self._char_len
 
     @property
     def is_empty(self) -> bool:
-        return not self.text
+        return self._char_len == 0
 
     @property
     def start_time(self) -> float:
@@ -30,11 +52,13 @@ class _SegmentBuffer:
     def duration(self) -> float:
         return self.end_time - self.start_time
 
-    def append(self, text_part: str, char_map_slice_part: list[float]):
+    def append(self, text_part: str, char_map_slice_part: array):
         if self.is_empty:
             self.start_char_offset = 0 # Assuming it starts from 0 initially
-        
-        self.text += text_part
+
+        self._text_parts.append(text_part)
+        self._char_len += len(text_part)
+        self._joined_text = None
         self.char_map_slice.extend(char_map_slice_part)
         self.end_char_offset += len(text_part)
 
@@ -74,24 +98,40 @@ class IntelligentSegmentMerger:
     _CHINESE_PUNCTUATION_PATTERN = re.compile(r'。。+')
     # Updated to handle quotes after sentence-ending punctuation
     _SENTENCE_SPLIT_PATTERN = re.compile(r'(?<!<SPECIALPUNC>)([.?!])["\']?(?!<SPECIALPUNC>)(?=\s+|$)')
+    # Detects whether a part ends a sentence in a single scan, ignoring
+    # trailing quotes and whitespace.
+    _SENTENCE_END_PATTERN = re.compile(r'[.?!]["\']?\s*$')
+    # Every normalization and split rule keys off one of these characters.
+    _HAS_SENTENCE_PUNCTUATION = re.compile(r'[.?!。]')
+    # Restores every normalization placeholder in one pass over the text.
+    _PLACEHOLDER_PATTERN = re.compile(r'<(?:PERIOD|DECIMAL_DOT|SPECIALPUNC)>')
+    _PLACEHOLDER_REPLACEMENTS = {
+        '<PERIOD>': '.',
+        '<DECIMAL_DOT>': '.',
+        '<SPECIALPUNC>': ''
+    }
 
     # Prioritized list of delimiters for smart splitting
     _SMART_SPLIT_DELIMITERS = [',', ';', ':', ' and ', ' but ', ' or ', ' so ']
 
     # Normalization rules, making it easy to add more.
-    # The order matters: protect decimals first.
+    # The order matters: protect decimals first. The third element is a
+    # literal trigger: the rule cannot match without it, so its absence
+    # lets the whole regex pass be skipped with one substring scan.
     _NORMALIZATION_RULES = [
-        (_DECIMAL_PATTERN, r'\1<DECIMAL_DOT>\2'),
-        (_CHINESE_PUNCTUATION_PATTERN, '...'),
-        (_ABBREVIATION_PATTERN, r'\1<PERIOD>'),
-        (_SPECIAL_PUNCTUATION_PATTERN, r'<SPECIALPUNC>\1<SPECIALPUNC>')
+        (_DECIMAL_PATTERN, r'\1<DECIMAL_DOT>\2', '.'),
+        (_CHINESE_PUNCTUATION_PATTERN, '...', '。。'),
+        (_ABBREVIATION_PATTERN, r'\1<PERIOD>', '.'),
+        (_SPECIAL_PUNCTUATION_PATTERN, r'<SPECIALPUNC>\1<SPECIALPUNC>', None)
     ]
 
     def __init__(self, transcript_segments, logger, max_chars=250, max_duration=15):
         self.transcript_segments = transcript_segments
         self.logger = logger
         self.full_text = ""
-        self.char_map = []
+        # One packed double per character; far more compact than a list of
+        # boxed floats and slices stay cheap to copy.
+        self.char_map = array('d')
         self.max_chars = max_chars
         self.max_duration = max_duration
 
@@ -108,54 +148,92 @@ class IntelligentSegmentMerger:
 
         return final_segments
 
+    @staticmethod
+    def _extract_segment_fields(segment, last_time):
+        """
+        Normalizes a dict- or object-style segment into (text, start, duration)
+        with a single type check.
+        """
+        if isinstance(segment, dict):
+            text = segment.get('text', '').strip()
+            start = segment.get('start', last_time)
+            if 'duration' in segment:
+                duration = segment['duration']
+            else: # Fallback for local files that might be missing duration
+                duration = segment.get('end', start) - start
+        else:
+            text = getattr(segment, 'text', '').strip()
+            start = getattr(segment, 'start', last_time)
+            if hasattr(segment, 'duration'):
+                duration = segment.duration
+            else: # Fallback for local files that might be missing duration
+                duration = getattr(segment, 'end', start) - start
+        return text, start, duration
+
     def _prepare_text_and_char_map(self):
         """
         Combines all text from segments and creates a character-to-timestamp map.
         """
+        # Extract the segment fields into parallel columns first, then build
+        # the text and timestamp map from those columns.
+        texts: list[str] = []
+        starts: list[float] = []
+        durations: list[float] = []
+
         last_time = 0.0
         for segment in self.transcript_segments:
-            is_dict = isinstance(segment, dict)
-            text = (segment.get('text', '') if is_dict else getattr(segment, 'text', '')).strip()
-            start = segment.get('start', last_time) if is_dict else getattr(segment, 'start', last_time)
-
-            if not is_dict and hasattr(segment, 'duration'):
-                duration = segment.duration
-            elif is_dict and 'duration' in segment:
-                duration = segment['duration']
-            else: # Fallback for local files that might be missing duration
-                end = segment.get('end', start) if is_dict else getattr(segment, 'end', start)
-                duration = end - start
-
-            end_time = start + duration
-            last_time = end_time
+            text, start, duration = self._extract_segment_fields(segment, last_time)
+            last_time = start + duration
 
             if not text:
                 continue
 
-            self.full_text += text + " "
+            texts.append(text)
+            starts.append(start)
+            durations.append(duration)
 
-            if len(text) > 0:
-                time_per_char = duration / len(text)
-                for i in range(len(text)):
-                    self.char_map.append(start + i * time_per_char)
-                self.char_map.append(end_time)
+        for text, start, duration in zip(texts, starts, durations):
+            time_per_char = duration / len(text)
+            self.char_map.extend([start + i * time_per_char for i in range(len(text))])
+            self.char_map.append(start + duration)
 
-        self.full_text = self.full_text.strip()
+        self.full_text = " ".join(texts)
 
     def _split_text_into_sentences(self):
         """
-        Normalizes and splits the full text into sentences using regex.
-        """
-        normalized_text = self.full_text
-        for pattern, replacement in self._NORMALIZATION_RULES:
-            normalized_text = pattern.sub(replacement, normalized_text)
+        Normalizes the full text and lazily yields sentence parts.
 
-        return self._SENTENCE_SPLIT_PATTERN.split(normalized_text)
+        A single finditer scan replaces re.split, so the parts are produced
+        on demand without materializing an interleaved list, and characters
+        matched outside the capture group (e.g. a quote after the
+        punctuation) are kept in the part instead of being dropped.
+        """
+        if not self._HAS_SENTENCE_PUNCTUATION.search(self.full_text):
+            # No sentence-ending punctuation anywhere: normalization and
+            # splitting would both be no-ops, so yield the text as-is.
+            yield self.full_text
+            return
 
-    def _find_best_split_point(self, text: str) -> int:
+        normalized_text = self.full_text
+        # The raw transcript is not needed once the normalized copy exists;
+        # drop our reference so at most one transcript-sized string stays
+        # alive while the parts stream out to the consumer.
+        self.full_text = ""
+        for pattern, replacement, trigger in self._NORMALIZATION_RULES:
+            if trigger is None or trigger in normalized_text:
+                normalized_text = pattern.sub(replacement, normalized_text)
+
+        pos = 0
+        for match in self._SENTENCE_SPLIT_PATTERN.finditer(normalized_text):
+            yield normalized_text[pos:match.end()]
+            pos = match.end()
+        if pos < len(normalized_text):
+            yield normalized_text[pos:]
+
+    def _find_best_split_point(self, text: str, max_chars: int | None = None) -> int:
         """Finds the best point to split a long text segment."""
-        split_point = self.max_chars
-        
+        split_point = max_chars if max_chars is not None else self.max_chars
+
         # Try to split by prioritized delimiters first
         for delimiter in self._SMART_SPLIT_DELIMITERS:
             pos = text.rfind(delimiter, 0, split_point)
@@ -168,33 +246,41 @@ class IntelligentSegmentMerger:
         if last_space != -1:
             return last_space + 1
 
-        # If no good split point is found, force split at max_chars
+        # A narrowed (duration-capped) window may contain no break at all;
+        # widen the search back to the configured limit rather than cutting
+        # a word in half mid-window.
+        if split_point < self.max_chars:
+            return self._find_best_split_point(text)
+
+        # If no good split point is found, force split at max_chars — but
+        # never inside a <...> normalization placeholder, which could not
+        # be restored once severed.
+        open_bracket = text.rfind('<', 0, split_point)
+        if open_bracket != -1 and text.find('>', open_bracket, split_point) == -1:
+            split_point = open_bracket
         return split_point
 
     def _build_merged_segments(self, sentences):
         """
         Reconstructs final segments from sentences using a buffer and smart splitting.
         """
-        final_segments = []
+        segment_spans = []
         current_buffer = _SegmentBuffer()
         char_offset = 0
 
         def _add_segment_from_buffer(buffer: _SegmentBuffer):
             if buffer.is_empty:
                 return
-            
-            text = buffer.text.strip().replace('<PERIOD>', '.').replace('<DECIMAL_DOT>', '.')
-            text = text.replace('<SPECIALPUNC>', '')
+
+            text = buffer.text.strip()
+            if '<' in text:
+                text = self._PLACEHOLDER_PATTERN.sub(
+                    lambda m: self._PLACEHOLDER_REPLACEMENTS[m.group()], text)
 
             if not text:
                 return
 
-            final_segments.append({
-                'text': text,
-                'start': buffer.start_time,
-                'end': buffer.end_time,
-                'duration': buffer.duration
-            })
+            segment_spans.append((text, buffer.start_time, buffer.end_time))
             self.logger.debug(f"Added segment: '{text[:50]}...' (Chars: {len(text)}, Time: {buffer.start_time:.2f}-{buffer.end_time:.2f})")
 
         for part in sentences:
@@ -207,26 +293,40 @@ class IntelligentSegmentMerger:
             char_offset += part_len
 
             # Smart splitting for long buffers
-            while len(current_buffer.text) > self.max_chars or current_buffer.duration > self.max_duration:
-                split_point = self._find_best_split_point(current_buffer.text)
-                
+            while current_buffer.char_len > self.max_chars or current_buffer.duration > self.max_duration:
+                # When the duration limit is the binding constraint, cap the
+                # split window at the character whose timestamp crosses the
+                # limit, found by bisecting the buffer's char map.
+                window = self.max_chars
+                if current_buffer.duration > self.max_duration and current_buffer.char_map_slice:
+                    time_cap = current_buffer.start_time + self.max_duration
+                    window = min(window, bisect.bisect_right(current_buffer.char_map_slice, time_cap))
+                split_point = self._find_best_split_point(current_buffer.text, window)
+
                 # Avoid infinite loops if a single part is too long
-                if split_point == 0 or split_point >= len(current_buffer.text):
+                if split_point == 0 or split_point >= current_buffer.char_len:
                      break
 
                 buffer_to_add, remaining_buffer = current_buffer.split_at(split_point)
                 _add_segment_from_buffer(buffer_to_add)
                 current_buffer = remaining_buffer
 
-            # Check if the part ends a sentence
-            if part.strip() and part.strip()[-1] in ".?!":
+            # Check if the part ends a sentence. The last character settles
+            # the common cases directly: '?'/'!' are unambiguous terminators
+            # and anything other than a period or quote cannot end a
+            # sentence, so the regex only runs for those.
+            last_char = part[-1]
+            if last_char in '?!' or (last_char in '."\'' and self._SENTENCE_END_PATTERN.search(part)):
                  _add_segment_from_buffer(current_buffer)
                  current_buffer = _SegmentBuffer()
 
         # Add any remaining text in the buffer
         _add_segment_from_buffer(current_buffer)
 
-        return final_segments
+        return [
+            {'text': text, 'start': start, 'end': end, 'duration': end - start}
+            for text, start, end in segment_spans
+        ]
 
 def merge_segments_intelligently(transcript_segments, logger=None):
     """
@@ -254,6 +354,17 @@ def load_and_merge_srt_segments(file_path, logger):
     """
     from .srt_handler import srt_to_segments
 
+    try:
+        cache_key = (str(file_path), os.path.getmtime(file_path))
+    except OSError:
+        cache_key = None
+
+    if cache_key is not None and cache_key in _SRT_MERGE_CACHE:
+        # Refresh recency, then hand out copies so callers can mutate freely.
+        cached = _SRT_MERGE_CACHE[cache_key] = _SRT_MERGE_CACHE.pop(cache_key)
+        logger.info(f"Reusing cached merge result for unchanged SRT file: {file_path}")
+        return [dict(segment) for segment in cached]
+
     logger.info(f"Reading and formatting SRT file: {file_path}")
     raw_subtitle_segments = srt_to_segments(file_path)
     if not raw_subtitle_segments:
@@ -264,4 +375,10 @@ def load_and_merge_srt_segments(file_path, logger):
 
     merged_segments = merge_segments_intelligently(raw_subtitle_segments, logger=logger)
     logger.info(f"Merged into {len(merged_segments)} segments for translation.")
+
+    if cache_key is not None:
+        if len(_SRT_MERGE_CACHE) >= _SRT_MERGE_CACHE_MAX:
+            _SRT_MERGE_CACHE.pop(next(iter(_SRT_MERGE_CACHE)))
+        _SRT_MERGE_CACHE[cache_key] = [dict(segment) for segment in merged_segments]
+
     return merged_segments